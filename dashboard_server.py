@@ -7,11 +7,11 @@ Provides real-time data updates for the dashboard via WebSocket
 import asyncio
 import os
 import re
-from datetime import datetime
+from datetime import datetime, timedelta
 from email.utils import parsedate_to_datetime
 from html import unescape
 from pathlib import Path
-from typing import Dict, List
+from typing import Callable, Dict, List, Optional, Set, Tuple
 from dotenv import load_dotenv
 import aiohttp
 from aiohttp import web
@@ -39,6 +39,8 @@ SERVER_HOST = os.getenv('SERVER_HOST', '0.0.0.0')
 SERVER_PORT = int(os.getenv('SERVER_PORT', '8080'))
 UPDATE_INTERVAL = int(os.getenv('UPDATE_INTERVAL', '300'))
 DEBUG_MODE = os.getenv('DEBUG_MODE', 'false').lower() == 'true'
+REFRESH_CLIENT_COOLDOWN = int(os.getenv('REFRESH_CLIENT_COOLDOWN', '30'))
+REFRESH_GLOBAL_COOLDOWN = int(os.getenv('REFRESH_GLOBAL_COOLDOWN', '10'))
 
 # Create Socket.IO server
 sio = socketio.AsyncServer(
@@ -478,9 +480,252 @@ class DashboardDataService:
             return None
 
 
+class RefreshCoordinator:  # pylint: disable=too-many-instance-attributes
+    """Throttle and coalesce manual refresh requests for one update channel
+
+    Each client may trigger at most one upstream refresh per client cooldown,
+    and all clients together at most one per global cooldown. Requests that
+    arrive while a refresh is running or a cooldown is active are folded into
+    the in-flight, deferred or next scheduled refresh rather than dropped.
+    Clients whose expected refresh time moves are sent a fresh refresh_status.
+    """
+
+    def __init__(self, channel: str, fetch: Callable, update_event: str,
+                 client_cooldown: float, global_cooldown: float):
+        self.channel = channel
+        self.fetch = fetch
+        self.update_event = update_event
+        self.client_cooldown = client_cooldown
+        self.global_cooldown = global_cooldown
+        # Loop time of the next periodic broadcast, if this channel has one
+        self.next_scheduled_at: Optional[float] = None
+        self._last_client_refresh: Dict[str, float] = {}
+        self._last_global_refresh: Optional[float] = None
+        self._in_flight: Optional[asyncio.Task] = None
+        self._in_flight_waiters: Set[str] = set()
+        # Pending clients mapped to the loop time their own cooldown ends
+        self._pending: Dict[str, float] = {}
+        self._pending_force = False
+        # Pending clients mapped to the (refresh_at, status) they were told
+        self._promised: Dict[str, Tuple[float, str]] = {}
+        self._deferred_task: Optional[asyncio.Task] = None
+        self._deferred_at: Optional[float] = None
+
+    async def request(self, sid: str, force: bool = False) -> Dict:
+        """Register a manual refresh request and return its status payload"""
+        now = asyncio.get_running_loop().time()
+
+        if self._in_flight is not None:
+            self._in_flight_waiters.add(sid)
+            if self._pending.pop(sid, None) is not None:
+                self._promised.pop(sid, None)
+                await self._reschedule(now)
+            return self._status('in_progress', now, now)
+
+        self._pending_force = self._pending_force or force
+        if sid not in self._pending:
+            self._pending[sid] = self._ready_at(sid)
+
+        # Start right away if this client and the global cooldown allow it,
+        # taking along any other pending clients that are also due
+        if self._pending[sid] <= now:
+            self._start(self._take_due(now), emit_to_waiters=True)
+            await self._reschedule(now)
+            return self._status('refreshing', now, now)
+
+        plan = await self._reschedule(now, requester=sid)
+        refresh_at, status = plan[sid]
+        return self._status(status, refresh_at, now)
+
+    async def run_scheduled(self):
+        """Run a scheduled refresh, absorbing any pending manual requests
+
+        Returns the fetched data for the caller to broadcast. If a manual
+        refresh is already in flight, its result is reused. The caller must
+        publish the next run time via set_next_scheduled once this returns.
+        """
+        self.next_scheduled_at = None
+        waiters = set(self._pending)
+        force = self._pending_force
+        self._pending.clear()
+        self._pending_force = False
+        self._promised.clear()
+        self._cancel_deferred()
+        if self._in_flight is None:
+            self._start(waiters, emit_to_waiters=False, force=force)
+        else:
+            self._in_flight_waiters |= waiters
+        return await asyncio.shield(self._in_flight)
+
+    async def set_next_scheduled(self, when: float):
+        """Record the next periodic run and update pending clients' estimates"""
+        self.next_scheduled_at = when
+        await self._reschedule(asyncio.get_running_loop().time())
+
+    async def forget(self, sid: str):
+        """Drop all throttling state for a disconnected client"""
+        self._last_client_refresh.pop(sid, None)
+        self._in_flight_waiters.discard(sid)
+        self._promised.pop(sid, None)
+        if self._pending.pop(sid, None) is not None:
+            await self._reschedule(asyncio.get_running_loop().time())
+
+    def _ready_at(self, sid: str) -> float:
+        """Earliest loop time at which this client may trigger a refresh"""
+        ready_at = 0.0
+        if sid in self._last_client_refresh:
+            ready_at = self._last_client_refresh[sid] + self.client_cooldown
+        if self._last_global_refresh is not None:
+            ready_at = max(ready_at, self._last_global_refresh + self.global_cooldown)
+        return ready_at
+
+    def _status(self, status: str, refresh_at: float, now: float) -> Dict:
+        """Build the refresh_status payload sent back to the client"""
+        delay = max(0.0, refresh_at - now)
+        return {
+            'channel': self.channel,
+            'status': status,
+            'refresh_at': (datetime.now() + timedelta(seconds=delay)).isoformat(),
+            'retry_after': round(delay, 1)
+        }
+
+    def _plan(self, now: float) -> Dict[str, Tuple[float, str]]:
+        """Predict when each pending client will be refreshed
+
+        Clients are served in order of their own cooldown, one upstream
+        refresh per global cooldown, until the next scheduled run picks up
+        everyone still waiting.
+        """
+        plan = {}
+        earliest = now
+        if self._last_global_refresh is not None:
+            earliest = max(earliest, self._last_global_refresh + self.global_cooldown)
+        scheduled = self.next_scheduled_at
+        run_at = None
+        for sid, ready_at in sorted(self._pending.items(), key=lambda item: item[1]):
+            if run_at is None or ready_at > run_at:
+                run_at = max(ready_at, earliest)
+                earliest = run_at + self.global_cooldown
+            if scheduled is not None and run_at >= scheduled:
+                plan[sid] = (scheduled, 'scheduled')
+            else:
+                plan[sid] = (run_at, 'deferred')
+        return plan
+
+    async def _reschedule(self, now: float,
+                          requester: Optional[str] = None) -> Dict[str, Tuple[float, str]]:
+        """Re-plan pending refreshes and tell clients whose estimate moved
+
+        All state is updated before the first await, and the returned plan
+        is the one computed here, so callers never see a plan that another
+        coroutine replaced while the notifications were being sent.
+        """
+        plan = self._plan(now)
+        changed = [
+            sid for sid, promise in plan.items()
+            if sid != requester and not self._same_promise(self._promised.get(sid), promise)
+        ]
+        self._promised = dict(plan)
+
+        deferred = [refresh_at for refresh_at, status in plan.values() if status == 'deferred']
+        if not deferred:
+            self._cancel_deferred()
+        elif min(deferred) != self._deferred_at:
+            self._cancel_deferred()
+            self._deferred_at = min(deferred)
+            self._deferred_task = asyncio.create_task(self._run_deferred(self._deferred_at))
+
+        for sid in changed:
+            # A newer plan (or a refresh that served this client) supersedes ours
+            if not self._same_promise(self._promised.get(sid), plan[sid]):
+                continue
+            refresh_at, status = plan[sid]
+            try:
+                await sio.emit('refresh_status', self._status(status, refresh_at, now), room=sid)
+            except Exception as e:
+                print(f'Error sending {self.channel} refresh status to {sid}: {e}')
+        return plan
+
+    @staticmethod
+    def _same_promise(old: Optional[Tuple[float, str]], new: Tuple[float, str]) -> bool:
+        """Whether a client's estimate is unchanged, ignoring float noise"""
+        return old is not None and old[1] == new[1] and abs(old[0] - new[0]) <= 0.05
+
+    def _cancel_deferred(self):
+        """Cancel the pending deferred refresh, if any"""
+        if self._deferred_task is not None:
+            self._deferred_task.cancel()
+        self._deferred_task = None
+        self._deferred_at = None
+
+    def _take_due(self, now: float) -> Set[str]:
+        """Remove and return pending clients whose own cooldown has ended"""
+        due = {sid for sid, ready_at in self._pending.items() if ready_at <= now}
+        for sid in due:
+            del self._pending[sid]
+            self._promised.pop(sid, None)
+        return due
+
+    async def _run_deferred(self, when: float):
+        """Start the coalesced refresh once the cooldown has elapsed"""
+        loop = asyncio.get_running_loop()
+        await asyncio.sleep(max(0.0, when - loop.time()))
+        self._deferred_task = None
+        self._deferred_at = None
+
+        now = loop.time()
+        due = self._take_due(now)
+        if due:
+            if self._in_flight is not None:
+                # A refresh started after these requests arrived; join it instead
+                self._in_flight_waiters |= due
+            else:
+                self._start(due, emit_to_waiters=True)
+        await self._reschedule(now)
+
+    def _start(self, waiters: Set[str], emit_to_waiters: bool, force: Optional[bool] = None):
+        """Begin an upstream refresh on behalf of the given clients"""
+        if force is None:
+            force = self._pending_force
+            if not self._pending:
+                self._pending_force = False
+        now = asyncio.get_running_loop().time()
+        self._last_global_refresh = now
+        for sid in waiters:
+            self._last_client_refresh[sid] = now
+        self._in_flight_waiters = set(waiters)
+        self._in_flight = asyncio.create_task(self._run(force, emit_to_waiters))
+
+    async def _run(self, force: bool, emit_to_waiters: bool):
+        """Fetch fresh data and deliver it to every client waiting on it"""
+        data = None
+        try:
+            data = await self.fetch(force)
+        except Exception as e:
+            print(f'Error during {self.channel} refresh: {e}')
+        finally:
+            waiters = self._in_flight_waiters
+            self._in_flight_waiters = set()
+            self._in_flight = None
+
+        if data and emit_to_waiters:
+            for sid in waiters:
+                await sio.emit(self.update_event, data, room=sid)
+        return data
+
 # Initialize data service
 data_service = DashboardDataService()
 
+# Throttle manual refreshes per channel
+dashboard_refresh = RefreshCoordinator(
+    'dashboard', data_service.fetch_all_data, 'dashboard_update',
+    REFRESH_CLIENT_COOLDOWN, REFRESH_GLOBAL_COOLDOWN
+)
+tech_news_refresh = RefreshCoordinator(
+    'tech_news', lambda force: data_service.fetch_tech_news_data(), 'tech_news_update',
+    REFRESH_CLIENT_COOLDOWN, REFRESH_GLOBAL_COOLDOWN
+)
+
 
 @sio.event
 async def connect(sid, environ):
@@ -499,6 +744,8 @@ async def disconnect(sid):
     """Handle client disconnection"""
     print(f'Client disconnected: {sid}')
     active_sessions.discard(sid)
+    await dashboard_refresh.forget(sid)
+    await tech_news_refresh.forget(sid)
 
 
 @sio.event
@@ -506,16 +753,15 @@ async def request_refresh(sid, payload=None):
     """Handle manual refresh request from client
 
     Accepts optional payload like {"force": true} to force-refresh XRP data.
+    Replies with a refresh_status event saying when fresh data will arrive.
     """
     force = False
     if isinstance(payload, dict):
         force = bool(payload.get('force', False))
 
-    print(f'Refresh requested by: {sid} (force={force})')
-
-    data = await data_service.fetch_all_data(force=force)
-    if data:
-        await sio.emit('dashboard_update', data, room=sid)
+    status = await dashboard_refresh.request(sid, force=force)
+    print(f'Refresh requested by: {sid} (force={force}, status={status["status"]})')
+    await sio.emit('refresh_status', status, room=sid)
 
 
 @sio.event
@@ -531,33 +777,41 @@ async def request_tech_news(sid):
 @sio.event
 async def request_tech_news_refresh(sid):
     """Handle manual tech news refresh request"""
-    print(f'Tech news refresh requested by: {sid}')
-
-    tech_news = await data_service.fetch_tech_news_data()
-    if tech_news:
-        await sio.emit('tech_news_update', tech_news, room=sid)
+    status = await tech_news_refresh.request(sid)
+    print(f'Tech news refresh requested by: {sid} (status={status["status"]})')
+    await sio.emit('refresh_status', status, room=sid)
 
 
 async def periodic_update():
     """Periodically fetch and broadcast updates to all connected clients"""
     await asyncio.sleep(5)  # Wait for server to fully start
 
+    loop = asyncio.get_running_loop()
     while True:
         try:
             if active_sessions:
                 print(f'Fetching data for {len(active_sessions)} active clients...')
-                data = await data_service.fetch_all_data()
+                data = await dashboard_refresh.run_scheduled()
+                # Publish the next run before broadcasting so requests that
+                # arrive mid-broadcast are told an accurate refresh time
+                await dashboard_refresh.set_next_scheduled(loop.time() + UPDATE_INTERVAL)
 
                 if data:
                     # Broadcast to all connected clients
                     await sio.emit('dashboard_update', data)
                     print(f'Data broadcast complete at {datetime.now().strftime("%H:%M:%S")}')
+            else:
+                await dashboard_refresh.set_next_scheduled(loop.time() + UPDATE_INTERVAL)
 
             # Wait 5 minutes before next update
             await asyncio.sleep(UPDATE_INTERVAL)
 
         except Exception as e:
             print(f'Error in periodic update: {e}')
+            try:
+                await dashboard_refresh.set_next_scheduled(loop.time() + 60)
+            except Exception as schedule_error:
+                print(f'Error updating refresh schedule: {schedule_error}')
             await asyncio.sleep(60)  # Wait 1 minute before retry on error
 
 
@@ -655,6 +909,8 @@ if __name__ == '__main__':
     print(f'  Primary Location: {PRIMARY_CITY}')
     print(f'  Secondary Location: {SECONDARY_CITY}')
     print(f'  Update Interval: {UPDATE_INTERVAL}s')
+    print(f'  Refresh Cooldown: {REFRESH_CLIENT_COOLDOWN}s per client, '
+          f'{REFRESH_GLOBAL_COOLDOWN}s global')
     print('=' * 60)
     print(f'Server will be available at: http://localhost:{SERVER_PORT}')
     print(f'Dashboard URL: http://localhost:{SERVER_PORT}/')
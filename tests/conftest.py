@@ -0,0 +1,59 @@
+"""Shared fixtures for IRIS server tests"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import dashboard_server  # pylint: disable=wrong-import-position
+
+
+class EmitRecorder:
+    """Stand-in for sio.emit that records events and yields like the real one"""
+
+    def __init__(self):
+        self.events = []
+
+    async def __call__(self, event, data, room=None):
+        self.events.append((event, room, data))
+        await asyncio.sleep(0)
+
+    def statuses(self, room):
+        """refresh_status payloads sent to one client"""
+        return [data for event, to, data in self.events
+                if event == 'refresh_status' and to == room]
+
+    def updates(self, room):
+        """Data update payloads sent to one client"""
+        return [data for event, to, data in self.events
+                if event != 'refresh_status' and to == room]
+
+
+class StubFetch:  # pylint: disable=too-few-public-methods
+    """Fake upstream fetch that counts calls"""
+
+    def __init__(self, delay=0.02):
+        self.delay = delay
+        self.calls = []
+
+    async def __call__(self, force):
+        self.calls.append(force)
+        await asyncio.sleep(self.delay)
+        return {'refresh': len(self.calls)}
+
+
+@pytest.fixture
+def emitted(monkeypatch):
+    """Replace the Socket.IO emit with a recorder"""
+    recorder = EmitRecorder()
+    monkeypatch.setattr(dashboard_server.sio, 'emit', recorder)
+    return recorder
+
+
+@pytest.fixture
+def fetch():
+    """Stub upstream fetch"""
+    return StubFetch()
@@ -0,0 +1,237 @@
+"""Tests for manual refresh throttling and coalescing"""
+
+import asyncio
+
+import pytest
+
+from dashboard_server import RefreshCoordinator
+
+
+def make_coordinator(fetch, client_cooldown=0.4, global_cooldown=0.2):
+    """Build a coordinator with short cooldowns for fast tests"""
+    return RefreshCoordinator('dashboard', fetch, 'dashboard_update',
+                              client_cooldown, global_cooldown)
+
+
+def test_first_request_refreshes_immediately(emitted, fetch):
+    """A client with no cooldown gets an immediate refresh"""
+    async def scenario():
+        coordinator = make_coordinator(fetch)
+        status = await coordinator.request('a', force=True)
+        await asyncio.sleep(0.05)
+        return status
+
+    status = asyncio.run(scenario())
+    assert status['status'] == 'refreshing'
+    assert status['retry_after'] == 0
+    assert fetch.calls == [True]
+    assert emitted.updates('a') == [{'refresh': 1}]
+
+
+def test_client_cooldown_defers_repeat_request(emitted, fetch):
+    """A repeat request waits out the client cooldown, then refreshes"""
+    async def scenario():
+        coordinator = make_coordinator(fetch, client_cooldown=0.4, global_cooldown=0.1)
+        await coordinator.request('a')
+        await asyncio.sleep(0.05)
+        status = await coordinator.request('a')
+        await asyncio.sleep(0.2)
+        calls_during_cooldown = len(fetch.calls)
+        await asyncio.sleep(0.3)
+        return status, calls_during_cooldown
+
+    status, calls_during_cooldown = asyncio.run(scenario())
+    assert status['status'] == 'deferred'
+    assert status['retry_after'] == pytest.approx(0.35, abs=0.05)
+    assert calls_during_cooldown == 1
+    assert len(fetch.calls) == 2
+    assert len(emitted.updates('a')) == 2
+
+
+def test_global_cooldown_defers_other_clients(emitted, fetch):
+    """A new client still waits out the global cooldown"""
+    async def scenario():
+        coordinator = make_coordinator(fetch, client_cooldown=1.0, global_cooldown=0.3)
+        await coordinator.request('a')
+        await asyncio.sleep(0.05)
+        status = await coordinator.request('b')
+        await asyncio.sleep(0.1)
+        calls_during_cooldown = len(fetch.calls)
+        await asyncio.sleep(0.25)
+        return status, calls_during_cooldown
+
+    status, calls_during_cooldown = asyncio.run(scenario())
+    assert status['status'] == 'deferred'
+    assert status['retry_after'] == pytest.approx(0.25, abs=0.05)
+    assert calls_during_cooldown == 1
+    assert len(fetch.calls) == 2
+    assert emitted.updates('b') == [{'refresh': 2}]
+
+
+def test_request_during_refresh_joins_in_flight(emitted, fetch):
+    """A request during a refresh shares it instead of fetching again"""
+    fetch.delay = 0.1
+
+    async def scenario():
+        coordinator = make_coordinator(fetch)
+        await coordinator.request('a')
+        status = await coordinator.request('b')
+        await asyncio.sleep(0.15)
+        return status
+
+    status = asyncio.run(scenario())
+    assert status['status'] == 'in_progress'
+    assert len(fetch.calls) == 1
+    assert emitted.updates('a') == [{'refresh': 1}]
+    assert emitted.updates('b') == [{'refresh': 1}]
+
+
+def test_cooldown_requests_coalesce_into_one_deferred_refresh(emitted, fetch):
+    """Requests in the same cooldown share one deferred refresh"""
+    async def scenario():
+        coordinator = make_coordinator(fetch, client_cooldown=1.0, global_cooldown=0.3)
+        await coordinator.request('a')
+        await asyncio.sleep(0.05)
+        first = await coordinator.request('b')
+        second = await coordinator.request('c', force=True)
+        await asyncio.sleep(0.35)
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first['status'] == second['status'] == 'deferred'
+    assert first['retry_after'] == pytest.approx(second['retry_after'], abs=0.05)
+    assert fetch.calls == [False, True]
+    assert emitted.updates('b') == [{'refresh': 2}]
+    assert emitted.updates('c') == [{'refresh': 2}]
+
+
+def test_request_before_scheduled_run_rides_along(emitted, fetch):
+    """A request due after the next scheduled run waits for that run"""
+    async def scenario():
+        coordinator = make_coordinator(fetch, client_cooldown=1.0, global_cooldown=0.3)
+        loop = asyncio.get_running_loop()
+        await coordinator.request('a')
+        await asyncio.sleep(0.05)
+        await coordinator.set_next_scheduled(loop.time() + 0.1)
+        status = await coordinator.request('a')
+        deferred_task = coordinator._deferred_task  # pylint: disable=protected-access
+        data = await coordinator.run_scheduled()
+        return status, deferred_task, data
+
+    status, deferred_task, data = asyncio.run(scenario())
+    assert status['status'] == 'scheduled'
+    assert status['retry_after'] == pytest.approx(0.1, abs=0.05)
+    assert deferred_task is None
+    assert data == {'refresh': 2}
+    # The scheduled run is broadcast by the caller, not sent per client
+    assert emitted.updates('a') == [{'refresh': 1}]
+
+
+def test_scheduled_time_is_cleared_while_scheduled_run_is_active(emitted, fetch):
+    """A past scheduled time is never offered as a refresh time"""
+    async def scenario():
+        coordinator = make_coordinator(fetch, client_cooldown=1.0, global_cooldown=0.2)
+        loop = asyncio.get_running_loop()
+        await coordinator.set_next_scheduled(loop.time())
+        await coordinator.run_scheduled()
+        status = await coordinator.request('z')
+        await asyncio.sleep(0.25)
+        return status
+
+    status = asyncio.run(scenario())
+    assert status['status'] == 'deferred'
+    assert status['retry_after'] == pytest.approx(0.18, abs=0.05)
+    assert emitted.updates('z') == [{'refresh': 2}]
+
+
+def test_status_resent_when_refresh_time_moves(emitted, fetch):
+    """A client whose refresh is pushed back is sent a new status"""
+    async def scenario():
+        coordinator = make_coordinator(fetch, client_cooldown=0.5, global_cooldown=0.4)
+        await coordinator.request('a')
+        await asyncio.sleep(0.1)
+        told = await coordinator.request('a')
+        await coordinator.request('b')
+        await asyncio.sleep(0.5)
+        calls_before_a_due = len(fetch.calls)
+        await asyncio.sleep(0.4)
+        return told, calls_before_a_due
+
+    told, calls_before_a_due = asyncio.run(scenario())
+    assert told['retry_after'] == pytest.approx(0.4, abs=0.05)
+    # b takes the refresh at 0.4s, pushing a back by the global cooldown
+    pushed = emitted.statuses('a')
+    assert len(pushed) == 1
+    assert pushed[0]['retry_after'] == pytest.approx(0.7, abs=0.05)
+    assert calls_before_a_due == 2
+    assert len(fetch.calls) == 3
+    assert len(emitted.updates('a')) == 2
+
+
+def test_earlier_client_does_not_pull_others_past_their_cooldown(emitted, fetch):
+    """An earlier deferred refresh does not serve clients still cooling down"""
+    async def scenario():
+        coordinator = make_coordinator(fetch, client_cooldown=0.6, global_cooldown=0.2)
+        await coordinator.request('a')
+        await asyncio.sleep(0.05)
+        await coordinator.request('a')
+        await coordinator.request('b')
+        await asyncio.sleep(0.3)
+        a_updates_early = len(emitted.updates('a'))
+        await asyncio.sleep(0.35)
+        return a_updates_early
+
+    a_updates_early = asyncio.run(scenario())
+    assert a_updates_early == 1
+    assert len(emitted.updates('b')) == 1
+    assert len(emitted.updates('a')) == 2
+    assert emitted.statuses('a') == []
+
+
+def test_forget_drops_pending_request(emitted, fetch):
+    """A disconnected client is dropped along with its deferred refresh"""
+    async def scenario():
+        coordinator = make_coordinator(fetch, client_cooldown=1.0, global_cooldown=0.2)
+        await coordinator.request('a')
+        await asyncio.sleep(0.05)
+        await coordinator.request('b')
+        await coordinator.forget('b')
+        deferred_task = coordinator._deferred_task  # pylint: disable=protected-access
+        await asyncio.sleep(0.25)
+        return deferred_task
+
+    deferred_task = asyncio.run(scenario())
+    assert deferred_task is None
+    assert len(fetch.calls) == 1
+    assert emitted.updates('b') == []
+
+
+@pytest.mark.usefixtures('emitted')
+def test_scheduled_run_during_request_notifications(fetch):
+    """A scheduled run that starts while a request is notifying others is safe"""
+    async def scenario():
+        coordinator = make_coordinator(fetch, client_cooldown=0.4, global_cooldown=0.3)
+        await coordinator.request('a')
+        await asyncio.sleep(0.05)
+        await coordinator.request('a')
+        # Y's request moves a's estimate, so it yields while notifying a;
+        # the scheduled run clears the plan in that window
+        return await asyncio.gather(coordinator.request('Y'), coordinator.run_scheduled())
+
+    status, data = asyncio.run(scenario())
+    assert status['status'] == 'deferred'
+    assert data == {'refresh': 2}
+
+
+def test_forget_during_request_notifications(emitted, fetch):
+    """A disconnect while its own request is notifying others is safe"""
+    async def scenario():
+        coordinator = make_coordinator(fetch, client_cooldown=0.4, global_cooldown=0.3)
+        await coordinator.request('a')
+        await asyncio.sleep(0.05)
+        await coordinator.request('a')
+        return await asyncio.gather(coordinator.request('Y'), coordinator.forget('Y'))
+
+    status, _ = asyncio.run(scenario())
+    assert status['status'] == 'deferred'
+    assert emitted.updates('Y') == []